@@ -3,28 +3,69 @@
 Used when heuristics alone are not confident about the complexity tier.
 """
 
-import json
+import asyncio
+import hashlib
+import io
 import logging
+import re
+import time
+from collections import OrderedDict
+from itertools import islice
 
-import httpx
+import orjson
 
+from .client import get_client
 from .config import get_config
 from .models import Tier, get_registry
 
 logger = logging.getLogger(__name__)
 
-CLASSIFIER_SYSTEM_PROMPT = """\
-You are a request complexity classifier. Given a user's conversation with an AI assistant, \
-classify the complexity of the LATEST user request into one of three tiers:
+# Classifier results: key -> (expires_at, classifier model, tier, reason, conversation tokens)
+_cache: OrderedDict[bytes, tuple[float, str, Tier, str, frozenset[str]]] = OrderedDict()
 
-1 = SIMPLE: Short factual questions, translations, simple formatting, yes/no questions, \
-basic lookups, trivial code fixes.
-2 = MEDIUM: Standard coding tasks, summarization of longer texts, moderate analysis, \
-explanations of concepts, typical chat interactions.
-3 = COMPLEX: Multi-step reasoning, architecture design, complex debugging, in-depth analysis, \
-creative writing with specific constraints, tasks requiring deep domain expertise.
+# Classifications currently running, by cache key
+_inflight: dict[bytes, asyncio.Future] = {}
 
-Respond with ONLY a JSON object: {"tier": 1|2|3, "reason": "brief explanation"}"""
+# Fuzzy lookups only compare against the most recent entries
+FUZZY_SCAN_LIMIT = 50
+# Too few tokens make Jaccard similarity meaningless
+FUZZY_MIN_TOKENS = 5
+
+_WORD_PATTERN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    # English
+    "a an and are as at be but by can do for from how i in is it me my of on or "
+    "please so that the this to was what with you your "
+    # German
+    "am auf aus bei bitte das dem den der die du ein eine einen es für ich ist "
+    "mir mit nicht oder und von was wie zu "
+    # Role labels written by _condense_messages
+    "assistant system tool unknown user".split()
+)
+
+CLASSIFIER_SYSTEM_PROMPT = (
+    "Classify latest user request complexity. "
+    "1=simple (lookup/translate/yes-no). "
+    "2=medium (coding/explain/summarize). "
+    "3=complex (multi-step/architecture/deep analysis). "
+    'Reply JSON only: {"tier":1|2|3}.'
+)
+
+CLASSIFIER_BATCH_SYSTEM_PROMPT = (
+    'Classify the latest user request complexity of each "Request N:". '
+    "1=simple (lookup/translate/yes-no). "
+    "2=medium (coding/explain/summarize). "
+    "3=complex (multi-step/architecture/deep analysis). "
+    'Reply JSON array only: [{"id":N,"tier":1|2|3},...].'
+)
+
+# Completion budget per classified request; the JSON reply is ~10 tokens
+REPLY_MAX_TOKENS = 20
+
+# Fast path for well-formed replies: pull the tier (and batch id) straight out
+# of each {...} object, markdown fences and all, without a JSON parse
+_TIER_OBJECT_PATTERN = re.compile(r'\{[^{}]*"tier"\s*:\s*([123])[^{}]*\}')
+_ID_PATTERN = re.compile(r'"id"\s*:\s*(\d+)')
 
 
 async def classify_complexity(messages: list[dict]) -> tuple[Tier, str]:
@@ -56,38 +97,40 @@ async def classify_complexity(messages: list[dict]) -> tuple[Tier, str]:
     # Build a condensed version of the conversation for classification
     condensed = _condense_messages(messages)
 
+    key = _cache_key(classifier_model, condensed)
+    tokens = _request_tokens(condensed)
+    cached = _cache_get(classifier_model, key, tokens)
+    if cached is not None:
+        logger.debug("Classifier cache hit: tier=%s", cached[0].name)
+        return cached
+
+    # Identical requests arriving while one is being classified share its call
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_classify_uncached(classifier_model, condensed, key, tokens))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.debug("Joining in-flight classification")
+    # Shielded so a cancelled caller doesn't cancel the call for the others
+    return await asyncio.shield(task)
+
+
+async def _classify_uncached(
+    classifier_model: str, condensed: str, key: bytes, tokens: frozenset[str]
+) -> tuple[Tier, str]:
+    cfg = get_config()
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.post(
-                f"{get_config().litellm_base_url}/chat/completions",
-                headers={"Authorization": f"Bearer {get_config().litellm_api_key}"},
-                json={
-                    "model": classifier_model,
-                    "messages": [
-                        {"role": "system", "content": CLASSIFIER_SYSTEM_PROMPT},
-                        {"role": "user", "content": condensed},
-                    ],
-                    "temperature": 0.0,
-                    "max_tokens": 100,
-                },
-            )
-            resp.raise_for_status()
-            result_text = resp.json()["choices"][0]["message"]["content"].strip()
-
-        # Parse JSON response
-        # Handle cases where model wraps in markdown code block
-        if result_text.startswith("```"):
-            result_text = result_text.strip("`").removeprefix("json").strip()
-
-        parsed = json.loads(result_text)
-        tier_num = int(parsed["tier"])
-        reason = parsed.get("reason", "")
-        tier = Tier(max(1, min(3, tier_num)))
+        if cfg.classifier_batch_size > 1:
+            tier, reason = await _get_batcher().classify(classifier_model, condensed)
+        else:
+            tier, reason = await _classify_single(classifier_model, condensed)
 
         logger.info(
             "Classifier (%s) result: tier=%s reason=%s",
             classifier_model, tier.name, reason,
         )
+        _cache_put(classifier_model, key, tokens, tier, reason)
         return tier, reason
 
     except Exception:
@@ -95,24 +138,274 @@ async def classify_complexity(messages: list[dict]) -> tuple[Tier, str]:
         return Tier.MEDIUM, "classifier error, defaulting to medium"
 
 
-def _condense_messages(messages: list[dict], max_chars: int = 2000) -> str:
+async def _complete(classifier_model: str, system_prompt: str, user_content: str, max_tokens: int) -> str:
+    """Send one classifier prompt to LiteLLM and return the reply text."""
+    resp = await get_client().post(
+        f"{get_config().litellm_base_url}/chat/completions",
+        headers={"Authorization": f"Bearer {get_config().litellm_api_key}"},
+        json={
+            "model": classifier_model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            "temperature": 0.0,
+            "max_tokens": max_tokens,
+        },
+        timeout=15,
+    )
+    resp.raise_for_status()
+    return orjson.loads(resp.content)["choices"][0]["message"]["content"].strip()
+
+
+def _load_json(result_text: str):
+    """Full JSON parse of a reply, for anything the fast patterns don't match."""
+    # Handle cases where model wraps in markdown code block
+    if result_text.startswith("```"):
+        result_text = result_text.strip("`").removeprefix("json").strip()
+    return orjson.loads(result_text)
+
+
+def _parse_tier(entry: dict) -> tuple[Tier, str]:
+    tier_num = int(entry["tier"])
+    return Tier(max(1, min(3, tier_num))), entry.get("reason", "")
+
+
+async def _classify_single(classifier_model: str, condensed: str) -> tuple[Tier, str]:
+    result_text = await _complete(classifier_model, CLASSIFIER_SYSTEM_PROMPT, condensed, REPLY_MAX_TOKENS)
+    m = _TIER_OBJECT_PATTERN.search(result_text)
+    if m:
+        return Tier(int(m.group(1))), ""
+    return _parse_tier(_load_json(result_text))
+
+
+async def _classify_batch(classifier_model: str, condensed: list[str]) -> list[tuple[Tier, str] | None]:
+    """Classify several requests with one LLM call.
+
+    Returns one result per input, None where the reply had no entry for it.
+    """
+    prompt = "\n\n".join(f"Request {i}:\n{text}" for i, text in enumerate(condensed, 1))
+    result_text = await _complete(
+        classifier_model, CLASSIFIER_BATCH_SYSTEM_PROMPT, prompt, REPLY_MAX_TOKENS * len(condensed)
+    )
+    results: list[tuple[Tier, str] | None] = [None] * len(condensed)
+    entries = [
+        (int(id_match.group(1)), (Tier(int(m.group(1))), ""))
+        for m in _TIER_OBJECT_PATTERN.finditer(result_text)
+        if (id_match := _ID_PATTERN.search(m.group()))
+    ]
+    if not entries:
+        entries = [(int(entry["id"]), _parse_tier(entry)) for entry in _load_json(result_text)]
+    for entry_id, result in entries:
+        if 1 <= entry_id <= len(results):
+            results[entry_id - 1] = result
+    return results
+
+
+class ClassifierBatcher:
+    """Coalesces concurrent classifier requests into batched LLM calls.
+
+    The first queued request opens a batch, which is sent once it holds
+    ``max_batch`` requests or ``max_wait`` seconds have passed.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[tuple[str, str, asyncio.Future]] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        # The loop only holds weak references to tasks; keep in-flight flushes alive
+        self._flushes: set[asyncio.Task] = set()
+
+    async def classify(self, classifier_model: str, condensed: str) -> tuple[Tier, str]:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((classifier_model, condensed, future))
+        return await future
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for flush in self._flushes:
+            flush.cancel()
+        self._flushes.clear()
+
+    async def _run(self) -> None:
+        batch: list[tuple[str, str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = self.loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - self.loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # Send in the background so the next batch can start collecting
+                flush = self.loop.create_task(self._flush(batch))
+                self._flushes.add(flush)
+                flush.add_done_callback(self._flushes.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # Don't leave callers waiting on requests that will never be sent
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("classifier batcher closed"))
+            raise
+
+    async def _flush(self, batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        try:
+            await self._send(batch)
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("classifier batcher closed"))
+            raise
+
+    async def _send(self, batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        by_model: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        for classifier_model, condensed, future in batch:
+            by_model.setdefault(classifier_model, []).append((condensed, future))
+
+        for classifier_model, items in by_model.items():
+            futures = [f for _, f in items]
+            try:
+                if len(items) == 1:
+                    results = [await _classify_single(classifier_model, items[0][0])]
+                else:
+                    logger.debug("Classifying %d requests in one batch", len(items))
+                    results = await _classify_batch(classifier_model, [c for c, _ in items])
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                if future.done():
+                    continue
+                if result is None:
+                    future.set_exception(ValueError("batched classifier reply had no entry for request"))
+                else:
+                    future.set_result(result)
+
+
+_batcher: ClassifierBatcher | None = None
+
+
+def _get_batcher() -> ClassifierBatcher:
+    """Return the batcher for the running event loop, (re)creating it as needed."""
+    global _batcher
+    cfg = get_config()
+    loop = asyncio.get_running_loop()
+    max_wait = cfg.classifier_batch_wait_ms / 1000
+    if (
+        _batcher is None
+        or _batcher.loop is not loop
+        or _batcher.max_batch != cfg.classifier_batch_size
+        or _batcher.max_wait != max_wait
+    ):
+        if _batcher is not None and _batcher.loop is loop:
+            # Config changed: retire the old batcher
+            _batcher.close()
+        _batcher = ClassifierBatcher(cfg.classifier_batch_size, max_wait)
+    return _batcher
+
+
+def close_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        _batcher.close()
+        _batcher = None
+
+
+def _cache_key(classifier_model: str, condensed: str) -> bytes:
+    return hashlib.blake2b(
+        f"{classifier_model}\0{condensed}".encode(), digest_size=16
+    ).digest()
+
+
+def _request_tokens(condensed: str) -> frozenset[str]:
+    """Stopword-filtered word set of the condensed conversation, for fuzzy matching.
+
+    Built from every turn the classifier sees, so the same latest message
+    after different earlier turns doesn't reuse a verdict.
+    """
+    return frozenset(w for w in _WORD_PATTERN.findall(condensed.lower()) if w not in _STOPWORDS)
+
+
+def _cache_get(classifier_model: str, key: bytes, tokens: frozenset[str]) -> tuple[Tier, str] | None:
+    """Look up a cached classification: exact key first, then a Jaccard match.
+
+    Fuzzy matches only consider verdicts from the same classifier model.
+    """
+    cfg = get_config()
+    if cfg.classifier_cache_ttl <= 0:
+        return None
+
+    now = time.monotonic()
+    entry = _cache.get(key)
+    if entry is not None:
+        if entry[0] > now:
+            _cache.move_to_end(key)
+            return entry[2], entry[3]
+        del _cache[key]
+
+    threshold = cfg.classifier_cache_similarity
+    if threshold <= 0 or len(tokens) < FUZZY_MIN_TOKENS:
+        return None
+    for expires_at, model, tier, reason, other in islice(reversed(_cache.values()), FUZZY_SCAN_LIMIT):
+        if expires_at <= now or model != classifier_model or not other:
+            continue
+        if len(tokens & other) / len(tokens | other) >= threshold:
+            return tier, reason
+    return None
+
+
+def _cache_put(classifier_model: str, key: bytes, tokens: frozenset[str], tier: Tier, reason: str) -> None:
+    cfg = get_config()
+    if cfg.classifier_cache_ttl <= 0:
+        return
+    _cache[key] = (time.monotonic() + cfg.classifier_cache_ttl, classifier_model, tier, reason, tokens)
+    _cache.move_to_end(key)
+    while len(_cache) > cfg.classifier_cache_size:
+        _cache.popitem(last=False)
+
+
+def _condense_messages(messages: list[dict], max_chars: int = 800) -> str:
     """Create a condensed representation of the conversation for classification."""
-    parts: list[str] = []
-    for msg in messages:
-        role = msg.get("role", "unknown")
+    out = io.StringIO()
+    for i, msg in enumerate(messages):
+        if i:
+            out.write("\n")
+        out.write(f"{msg.get('role', 'unknown')}: ")
         content = msg.get("content", "")
         if isinstance(content, list):
-            text_parts = []
+            # Write text blocks straight into the buffer, no per-message join
+            sep = ""
             for block in content:
                 if isinstance(block, dict) and block.get("type") == "text":
-                    text_parts.append(block.get("text", ""))
+                    out.write(sep)
+                    out.write(block.get("text", ""))
+                    sep = " "
                 elif isinstance(block, dict) and block.get("type") == "image_url":
-                    text_parts.append("[image]")
-            content = " ".join(text_parts)
-        parts.append(f"{role}: {content}")
+                    out.write(sep)
+                    out.write("[image]")
+                    sep = " "
+        else:
+            out.write(f"{content}")
 
-    full_text = "\n".join(parts)
+    full_text = out.getvalue()
     if len(full_text) > max_chars:
         # Keep system prompt + last messages
-        return full_text[:500] + "\n...\n" + full_text[-1500:]
+        head = max_chars // 4
+        return full_text[:head] + "\n...\n" + full_text[-(max_chars - head):]
     return full_text
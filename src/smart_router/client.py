@@ -0,0 +1,32 @@
+"""Shared HTTP client for all requests to the LiteLLM backend.
+
+Reusing one pooled client keeps connections to LiteLLM alive between
+requests instead of opening a new TCP (and TLS) connection per call.
+"""
+
+import httpx
+
+_client: httpx.AsyncClient | None = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(120, connect=5),
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
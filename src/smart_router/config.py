@@ -1,5 +1,6 @@
 import logging
 import os
+import sys
 from pathlib import Path
 
 import yaml
@@ -15,6 +16,31 @@ CONFIG_PATH = Path(os.environ.get("CONFIG_PATH", "router_config.yaml"))
 class RouterConfig:
     """Central configuration — loaded entirely from router_config.yaml."""
 
+    __slots__ = (
+        "litellm_base_url",
+        "litellm_api_key",
+        "router_port",
+        "log_level",
+        "model_name",
+        "tier1_max_params",
+        "tier2_max_params",
+        "heuristic_low_threshold",
+        "heuristic_high_threshold",
+        "classifier_model",
+        "model_cache_ttl",
+        "classifier_cache_ttl",
+        "classifier_cache_size",
+        "classifier_cache_similarity",
+        "classifier_batch_size",
+        "classifier_batch_wait_ms",
+        "response_cache_ttl",
+        "response_cache_size",
+        "filter_mode",
+        "allowed_models",
+        "excluded_models",
+        "tier_overrides",
+    )
+
     def __init__(self):
         # Connection
         self.litellm_base_url: str = "http://localhost:4000/v1"
@@ -39,10 +65,23 @@ class RouterConfig:
         # How often to re-fetch models from LiteLLM (seconds)
         self.model_cache_ttl: int = 300
 
+        # Classifier result cache (ttl 0 disables, similarity 0 disables fuzzy hits)
+        self.classifier_cache_ttl: int = 600
+        self.classifier_cache_size: int = 512
+        self.classifier_cache_similarity: float = 0.6
+
+        # Batch concurrent classifier requests into one LLM call (size 1 disables)
+        self.classifier_batch_size: int = 8
+        self.classifier_batch_wait_ms: int = 25
+
+        # Reuse completions of identical temperature-0 requests (ttl 0 disables)
+        self.response_cache_ttl: int = 60
+        self.response_cache_size: int = 1024
+
         # Model filtering
         self.filter_mode: str = "blocklist"
-        self.allowed_models: set[str] = set()
-        self.excluded_models: set[str] = set()
+        self.allowed_models: frozenset[str] = frozenset()
+        self.excluded_models: frozenset[str] = frozenset()
         self.tier_overrides: dict[str, str] = {}
 
     def is_model_enabled(self, model_id: str) -> bool:
@@ -58,21 +97,28 @@ class RouterConfig:
 _config = RouterConfig()
 
 
+def _model_ids(raw) -> frozenset[str]:
+    """Freeze a list of model ids, interned so lookups against them compare by identity."""
+    return frozenset(sys.intern(str(model_id)) for model_id in raw or ())
+
+
 def _parse_models_config(cfg: RouterConfig, models_raw) -> None:
     """Parse the models section which can be a flat list or a tier-grouped dict."""
     if isinstance(models_raw, list):
-        cfg.allowed_models = set(models_raw)
+        cfg.allowed_models = _model_ids(models_raw)
     elif isinstance(models_raw, dict):
+        allowed: list[str] = []
         for key, value in models_raw.items():
             if key.lower() in VALID_TIERS and isinstance(value, list):
                 tier_name = key.upper()
                 for model_id in value:
-                    cfg.allowed_models.add(model_id)
-                    cfg.tier_overrides[model_id] = tier_name
+                    allowed.append(model_id)
+                    cfg.tier_overrides[sys.intern(str(model_id))] = tier_name
             elif isinstance(key, str):
-                cfg.allowed_models.add(key)
+                allowed.append(key)
+        cfg.allowed_models = _model_ids(allowed)
     else:
-        cfg.allowed_models = set()
+        cfg.allowed_models = frozenset()
 
 
 def load_config() -> RouterConfig:
@@ -104,6 +150,15 @@ def load_config() -> RouterConfig:
         cfg.heuristic_high_threshold = routing.get("heuristic_high_threshold", cfg.heuristic_high_threshold)
         cfg.classifier_model = routing.get("classifier_model", cfg.classifier_model)
         cfg.model_cache_ttl = routing.get("model_cache_ttl", cfg.model_cache_ttl)
+        cfg.classifier_cache_ttl = routing.get("classifier_cache_ttl", cfg.classifier_cache_ttl)
+        cfg.classifier_cache_size = routing.get("classifier_cache_size", cfg.classifier_cache_size)
+        cfg.classifier_cache_similarity = routing.get(
+            "classifier_cache_similarity", cfg.classifier_cache_similarity
+        )
+        cfg.classifier_batch_size = routing.get("classifier_batch_size", cfg.classifier_batch_size)
+        cfg.classifier_batch_wait_ms = routing.get("classifier_batch_wait_ms", cfg.classifier_batch_wait_ms)
+        cfg.response_cache_ttl = routing.get("response_cache_ttl", cfg.response_cache_ttl)
+        cfg.response_cache_size = routing.get("response_cache_size", cfg.response_cache_size)
 
         # Tier boundaries
         tiers = routing.get("tier_boundaries", {})
@@ -112,7 +167,7 @@ def load_config() -> RouterConfig:
 
         # Models
         cfg.filter_mode = data.get("filter_mode", cfg.filter_mode)
-        cfg.excluded_models = set(data.get("excluded", []))
+        cfg.excluded_models = _model_ids(data.get("excluded", []))
         _parse_models_config(cfg, data.get("models", []))
 
         _config = cfg
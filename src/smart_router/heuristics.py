@@ -3,9 +3,27 @@
 Returns a score between 0.0 (trivial) and 1.0 (very complex).
 """
 
+import hashlib
+import io
+import logging
 import re
+from collections import OrderedDict
 from dataclasses import dataclass
 
+from .config import get_config
+
+try:
+    import hyperscan
+except ImportError:  # optional dependency, falls back to `re`
+    hyperscan = None
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a length estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class HeuristicResult:
@@ -68,125 +86,247 @@ SIMPLE_KEYWORDS = re.compile(
 
 CODE_BLOCK_PATTERN = re.compile(r"```[\s\S]*?```")
 
+# Text scans (code blocks, keywords, tokens) only look at this many characters;
+# anything beyond is counted by length alone
+MAX_SCAN_CHARS = 16384
+
+# Keyword categories in scan order; each is matched independently, so a phrase
+# can count for more than one category (e.g. "explain in detail" and "explain")
+_GROUPS = ("complex", "moderate", "simple")
+_GROUP_PATTERNS = (COMPLEX_KEYWORDS, MODERATE_KEYWORDS, SIMPLE_KEYWORDS)
+
+
+# tiktoken encoding, set by load_encoding() at startup; until then (or if it
+# cannot be loaded) tokens are estimated from length
+_encoding = None
+
+
+def load_encoding() -> None:
+    """Load the tiktoken encoding used for token counts.
+
+    Blocking, possibly indefinitely: the encoding file is downloaded on first
+    use, with no timeout. Run it in a background thread, never on the request
+    path or the event loop.
+    """
+    global _encoding
+    if tiktoken is None:
+        return
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("tiktoken encoding unavailable, estimating tokens from length: %s", e)
+
+
+# Token counts of recently seen texts, keyed by digest so no text is retained
+_token_counts: OrderedDict[bytes, int] = OrderedDict()
+TOKEN_CACHE_SIZE = 1024
+
 
 def _estimate_tokens(text: str) -> int:
-    """Rough token estimate: ~4 chars per token for English."""
-    return len(text) // 4
+    """Token count of ``text``; ~4 chars per token if tiktoken is not loaded.
+
+    Cached, since multi-turn requests resend the same messages every turn.
+    """
+    encoding = _encoding
+    if encoding is None:
+        return len(text) // 4
+    key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    count = _token_counts.get(key)
+    if count is not None:
+        _token_counts.move_to_end(key)
+        return count
+    count = len(encoding.encode(text, disallowed_special=()))
+    _token_counts[key] = count
+    if len(_token_counts) > TOKEN_CACHE_SIZE:
+        _token_counts.popitem(last=False)
+    return count
+
 
+def _write_msg_text(out: io.StringIO, msg: dict) -> None:
+    """Write the text content of a single message into ``out``."""
+    content = msg.get("content", "")
+    if isinstance(content, str):
+        out.write(content)
+    elif isinstance(content, list):
+        sep = ""
+        for block in content:
+            if isinstance(block, dict):
+                if block.get("type") == "text":
+                    out.write(sep)
+                    out.write(block.get("text", ""))
+                    sep = "\n"
+                elif block.get("type") == "image_url":
+                    out.write(sep)
+                    out.write("[IMAGE]")
+                    sep = "\n"
 
-def _extract_text(messages: list[dict]) -> str:
-    """Extract all text content from messages."""
+
+def _msg_text(msg: dict) -> str:
+    """Extract the text content of a single message."""
+    content = msg.get("content", "")
+    if isinstance(content, str):
+        return content
+    out = io.StringIO()
+    _write_msg_text(out, msg)
+    return out.getvalue()
+
+
+def _join_window(texts: list[str], max_chars: int = MAX_SCAN_CHARS) -> str:
+    """Join message texts with newlines, stopping after ``max_chars`` characters."""
     parts: list[str] = []
-    for msg in messages:
-        content = msg.get("content", "")
-        if isinstance(content, str):
-            parts.append(content)
-        elif isinstance(content, list):
-            for block in content:
-                if isinstance(block, dict):
-                    if block.get("type") == "text":
-                        parts.append(block.get("text", ""))
-                    elif block.get("type") == "image_url":
-                        parts.append("[IMAGE]")
+    left = max_chars
+    for text in texts:
+        if parts:
+            left -= 1  # separator
+            if left < 0:
+                break
+        # Slice before joining so an oversized message isn't copied in full
+        text = text[:left]
+        parts.append(text)
+        left -= len(text)
     return "\n".join(parts)
 
 
-def score_request(
-    messages: list[dict],
-    tools: list[dict] | None = None,
-) -> HeuristicResult:
-    reasons: list[str] = []
-    score = 0.0
-    full_text = _extract_text(messages)
-    total_tokens = _estimate_tokens(full_text)
-    num_turns = len(messages)
+def _compile_hyperscan_db():
+    """Compile the keyword patterns into one Hyperscan database, IDs in `_GROUPS` order."""
+    if hyperscan is None:
+        return None
+    patterns = _GROUP_PATTERNS
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_SOM_LEFTMOST
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.pattern.encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=[flags] * len(patterns),
+        )
+    except Exception:
+        logger.warning("Failed to compile Hyperscan keyword database, using re", exc_info=True)
+        return None
+    return db
 
-    # --- Token count scoring ---
+
+_HS_DB = _compile_hyperscan_db()
+
+
+def _scan_keywords_re(text: str) -> dict[str, list[str]]:
+    return {
+        group: [m.group() for m in pattern.finditer(text)]
+        for group, pattern in zip(_GROUPS, _GROUP_PATTERNS)
+    }
+
+
+def _scan_keywords_hyperscan(text: str) -> dict[str, list[str]] | None:
+    """Hyperscan scan of ``text``, or None if it must go through re."""
+    # Hyperscan only knows ASCII word boundaries: any non-ASCII letter would
+    # count as one. Folding umlauts isn't safe either, as most pattern letters
+    # accept only the ASCII spelling ("wäs ist" is not "was ist").
+    if not text.isascii():
+        return None
+    data = text.encode()
+    hits: list[tuple[int, int, int]] = []
+
+    def on_match(group_id: int, start: int, end: int, flags: int, context) -> None:
+        # Sort key mirrors re within each category: leftmost start, then the
+        # greedy (longest) match
+        hits.append((group_id, start, -end))
+
+    _HS_DB.scan(data, match_event_handler=on_match)
+    hits.sort()
+
+    # Hyperscan reports every match; keep the non-overlapping ones re would
+    # find. Offsets into ASCII data are offsets into ``text`` too.
+    matches: dict[str, list[str]] = {g: [] for g in _GROUPS}
+    last_group = -1
+    last_end = 0
+    for group_id, start, end in hits:
+        if group_id != last_group:
+            last_group = group_id
+            last_end = 0
+        if start < last_end:
+            continue
+        last_end = -end
+        matches[_GROUPS[group_id]].append(text[start:last_end])
+    return matches
+
+
+def _scan_keywords(text: str) -> dict[str, list[str]]:
+    """Collect keyword matches per category."""
+    if _HS_DB is not None:
+        matches = _scan_keywords_hyperscan(text)
+        if matches is not None:
+            return matches
+    return _scan_keywords_re(text)
+
+
+# Single short messages without tools take the fast path in score_request
+SHORT_REQUEST_CHARS = 200
+
+
+def _token_score(total_tokens: int, reasons: list[str]) -> float:
     if total_tokens < 50:
-        score += 0.0
         reasons.append(f"very short ({total_tokens} est. tokens)")
+        return 0.0
     elif total_tokens < 200:
-        score += 0.1
+        return 0.1
     elif total_tokens < 800:
-        score += 0.25
         reasons.append(f"medium length ({total_tokens} est. tokens)")
+        return 0.25
     elif total_tokens < 2000:
-        score += 0.4
         reasons.append(f"long ({total_tokens} est. tokens)")
+        return 0.4
     else:
-        score += 0.5
         reasons.append(f"very long ({total_tokens} est. tokens)")
+        return 0.5
 
-    # --- Conversation depth ---
-    if num_turns > 10:
-        score += 0.15
-        reasons.append(f"deep conversation ({num_turns} turns)")
-    elif num_turns > 4:
-        score += 0.08
-        reasons.append(f"multi-turn ({num_turns} turns)")
-
-    # --- Tool/function calling ---
-    if tools:
-        tool_count = len(tools)
-        if tool_count > 3:
-            score += 0.2
-            reasons.append(f"many tools ({tool_count})")
-        else:
-            score += 0.1
-            reasons.append(f"tool use ({tool_count} tools)")
-
-    # --- System prompt complexity ---
-    system_msgs = [m for m in messages if m.get("role") == "system"]
-    if system_msgs:
-        system_text = _extract_text(system_msgs)
-        system_tokens = _estimate_tokens(system_text)
-        if system_tokens > 500:
-            score += 0.15
-            reasons.append(f"complex system prompt ({system_tokens} est. tokens)")
-        elif system_tokens > 100:
-            score += 0.05
 
-    # --- Code blocks ---
-    code_blocks = CODE_BLOCK_PATTERN.findall(full_text)
-    if len(code_blocks) > 2:
-        score += 0.15
-        reasons.append(f"multiple code blocks ({len(code_blocks)})")
+def _code_block_score(text: str, reasons: list[str]) -> float:
+    if "```" not in text:
+        return 0.0
+    code_blocks = sum(1 for _ in CODE_BLOCK_PATTERN.finditer(text))
+    if code_blocks > 2:
+        reasons.append(f"multiple code blocks ({code_blocks})")
+        return 0.15
     elif code_blocks:
-        score += 0.05
+        return 0.05
+    return 0.0
 
-    # --- Images ---
-    if "[IMAGE]" in full_text:
-        score += 0.1
-        reasons.append("contains images")
 
-    # --- Keyword analysis (on last user message) ---
-    user_msgs = [m for m in messages if m.get("role") == "user"]
-    last_user_text = _extract_text(user_msgs[-1:]) if user_msgs else ""
+def _keyword_score(last_user_text: str, reasons: list[str]) -> float:
+    if not last_user_text:
+        return 0.0
+    score = 0.0
+    keyword_matches = _scan_keywords(last_user_text)
 
-    complex_matches = [m.group() for m in COMPLEX_KEYWORDS.finditer(last_user_text)]
+    complex_matches = keyword_matches["complex"]
     if complex_matches:
         keyword_score = min(0.7, 0.2 + 0.15 * len(complex_matches))
         score += keyword_score
         reasons.append(f"complex keywords ({len(complex_matches)}): {', '.join(set(complex_matches[:3]))}")
 
-    moderate_matches = [m.group() for m in MODERATE_KEYWORDS.finditer(last_user_text)]
+    moderate_matches = keyword_matches["moderate"]
     if moderate_matches:
         keyword_score = min(0.2, 0.1 * len(moderate_matches))
         score += keyword_score
         reasons.append(f"moderate keywords ({len(moderate_matches)}): {', '.join(set(moderate_matches[:3]))}")
 
-    simple_matches = [m.group() for m in SIMPLE_KEYWORDS.finditer(last_user_text)]
+    simple_matches = keyword_matches["simple"]
     if simple_matches and not complex_matches and not moderate_matches:
         score -= 0.15
         reasons.append(f"simple keywords: {', '.join(set(simple_matches[:3]))}")
 
+    return score
+
+
+def _result(score: float, reasons: list[str]) -> HeuristicResult:
     # Clamp
     score = max(0.0, min(1.0, score))
 
     # Confidence: score clearly in one tier's range with margin from boundaries
-    from .config import get_config
-    low_thresh = get_config().heuristic_low_threshold
-    high_thresh = get_config().heuristic_high_threshold
+    cfg = get_config()
+    low_thresh = cfg.heuristic_low_threshold
+    high_thresh = cfg.heuristic_high_threshold
     margin = 0.1
     confident = (
         score < low_thresh - margin  # clearly SMALL
@@ -195,3 +335,101 @@ def score_request(
     )
 
     return HeuristicResult(score=round(score, 3), reasons=reasons, confident=confident)
+
+
+def _score_short_request(content: str) -> HeuristicResult:
+    """Score a single short user text message.
+
+    Gives the same result as the full path, minus the work that cannot
+    contribute here: no conversation depth, tools, images or system prompt,
+    and the message is its own full text.
+    """
+    reasons: list[str] = []
+    score = _token_score(_estimate_tokens(content), reasons)
+    score += _code_block_score(content, reasons)
+    if "[IMAGE]" in content:
+        score += 0.1
+        reasons.append("contains images")
+    score += _keyword_score(content, reasons)
+    return _result(score, reasons)
+
+
+def score_request(
+    messages: list[dict],
+    tools: list[dict] | None = None,
+) -> HeuristicResult:
+    # Fast path for the most common request: one short user message, no tools
+    if not tools and len(messages) == 1 and messages[0].get("role") == "user":
+        content = messages[0].get("content", "")
+        if isinstance(content, str) and len(content) < SHORT_REQUEST_CHARS:
+            return _score_short_request(content)
+
+    reasons: list[str] = []
+    # One pass over the messages collects every view of the text
+    texts: list[str] = []
+    last_user_text = ""
+    total_tokens = 0
+    system_tokens = 0
+    has_image = False
+    window_left = MAX_SCAN_CHARS
+    for m in messages:
+        t = _msg_text(m)
+        texts.append(t)
+        # Messages are counted one by one so repeated turns hit the token cache;
+        # text past the scan window is estimated from its length
+        if len(t) <= window_left:
+            tokens = _estimate_tokens(t)
+            window_left -= len(t)
+        else:
+            tokens = len(t) // 4
+            window_left = 0
+        total_tokens += tokens
+        has_image = has_image or "[IMAGE]" in t
+        role = m.get("role")
+        if role == "system":
+            system_tokens += tokens
+        elif role == "user":
+            last_user_text = t
+    full_text = _join_window(texts)
+    num_turns = len(messages)
+
+    # --- Token count scoring ---
+    score = _token_score(total_tokens, reasons)
+
+    # --- Conversation depth ---
+    if num_turns > 10:
+        score += 0.15
+        reasons.append(f"deep conversation ({num_turns} turns)")
+    elif num_turns > 4:
+        score += 0.08
+        reasons.append(f"multi-turn ({num_turns} turns)")
+
+    # --- Tool/function calling ---
+    if tools:
+        tool_count = len(tools)
+        if tool_count > 3:
+            score += 0.2
+            reasons.append(f"many tools ({tool_count})")
+        else:
+            score += 0.1
+            reasons.append(f"tool use ({tool_count} tools)")
+
+    # --- System prompt complexity ---
+    if system_tokens > 500:
+        score += 0.15
+        reasons.append(f"complex system prompt ({system_tokens} est. tokens)")
+    elif system_tokens > 100:
+        score += 0.05
+
+    # --- Code blocks ---
+    score += _code_block_score(full_text, reasons)
+
+    # --- Images ---
+    if has_image:
+        score += 0.1
+        reasons.append("contains images")
+
+    # --- Keyword analysis (on last user message) ---
+    score += _keyword_score(last_user_text[:MAX_SCAN_CHARS], reasons)
+
+    return _result(score, reasons)
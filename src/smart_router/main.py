@@ -1,17 +1,30 @@
 """FastAPI application — OpenAI-compatible smart router."""
 
 import logging
+import threading
 from contextlib import asynccontextmanager
+from typing import Any
 
+import orjson
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 
+from .classifier import close_batcher
+from .client import close_client, get_client
 from .config import load_config, get_config
+from .heuristics import load_encoding
 from .models import refresh_models, get_registry, Tier
 from .router import route_request
 from .proxy import proxy_chat_completion, proxy_chat_completion_stream
 
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     cfg = load_config()
@@ -22,13 +35,20 @@ async def lifespan(app: FastAPI):
     logger = logging.getLogger(__name__)
     logger.info("Starting Smart Router on port %d", cfg.router_port)
     logger.info("LiteLLM backend: %s", cfg.litellm_base_url)
+    get_client()
+    # May download the tokenizer file, which can hang on offline hosts; token
+    # counts use the length estimate until it is loaded. A daemon thread so a
+    # stuck download doesn't hold up shutdown either.
+    threading.Thread(target=load_encoding, name="load-encoding", daemon=True).start()
     await refresh_models(force=True)
     registry = get_registry()
     logger.info("Loaded %d models", len(registry.models))
     yield
+    close_batcher()
+    await close_client()
 
 
-app = FastAPI(title="LLM Smart Router", lifespan=lifespan)
+app = FastAPI(title="LLM Smart Router", lifespan=lifespan, default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 
@@ -78,22 +98,31 @@ async def reload_config():
 
 @app.post("/v1/chat/completions")
 async def chat_completions(request: Request):
-    body = await request.json()
+    try:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        body = None
+    if not isinstance(body, dict):
+        return ORJSONResponse(
+            status_code=400,
+            content={"error": {"message": "request body must be a JSON object", "type": "invalid_request_error"}},
+        )
+
     messages = body.get("messages", [])
     tools = body.get("tools")
     requested_model = body.get("model")
     stream = body.get("stream", False)
 
-    if not messages:
-        return JSONResponse(
+    if not messages or not isinstance(messages, list):
+        return ORJSONResponse(
             status_code=400,
-            content={"error": {"message": "messages is required", "type": "invalid_request_error"}},
+            content={"error": {"message": "messages must be a non-empty list", "type": "invalid_request_error"}},
         )
 
     try:
         model, routing_meta = await route_request(messages, tools, requested_model)
     except RuntimeError as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={"error": {"message": str(e), "type": "server_error"}},
         )
@@ -116,12 +145,13 @@ async def chat_completions(request: Request):
             },
         )
 
-    result = await proxy_chat_completion(body, model.id)
+    result, cached = await proxy_chat_completion(body, model.id)
     result["_routing"] = routing_meta
-    return JSONResponse(
+    return ORJSONResponse(
         content=result,
         headers={
             "X-Smart-Router-Model": model.id,
             "X-Smart-Router-Tier": routing_meta.get("tier", ""),
+            "X-Smart-Router-Cache": "hit" if cached else "miss",
         },
     )
@@ -1,11 +1,15 @@
+import asyncio
 import re
+import sys
 import time
 import logging
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 from enum import IntEnum
 
-import httpx
+import orjson
 
+from .client import get_client
 from .config import get_config, load_config
 
 logger = logging.getLogger(__name__)
@@ -17,6 +21,7 @@ EXCLUDE_PATTERNS = re.compile(r"ocr|whisper|tts|rerank", re.IGNORECASE)
 PARAM_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*[bB](?:\b|$)")
 # Matches MoE active parameter patterns like "A3B" (3B active)
 MOE_ACTIVE_PATTERN = re.compile(r"[Aa](\d+(?:\.\d+)?)[bB]")
+CODER_PATTERN = re.compile(r"coder|code", re.IGNORECASE)
 
 
 class Tier(IntEnum):
@@ -25,7 +30,7 @@ class Tier(IntEnum):
     LARGE = 3
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ModelInfo:
     id: str
     total_params: float | None = None  # billions
@@ -38,20 +43,40 @@ class ModelInfo:
         return self.total_params or self.active_params or 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelRegistry:
     models: dict[str, ModelInfo] = field(default_factory=dict)
     _last_refresh: float = 0.0
+    # Per-tier indices, built once and sorted by effective params (largest first).
+    # Indexed by ``tier - 1`` since tiers are numbered from 1.
+    _by_tier: list[list[ModelInfo]] = field(init=False, repr=False)
+    _coders_by_tier: list[list[ModelInfo]] = field(init=False, repr=False)
+    _general_by_tier: list[list[ModelInfo]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._by_tier = [[] for _ in Tier]
+        self._coders_by_tier = [[] for _ in Tier]
+        self._general_by_tier = [[] for _ in Tier]
+        for m in sorted(self.models.values(), key=lambda m: m.effective_params, reverse=True):
+            i = m.tier - 1
+            self._by_tier[i].append(m)
+            if m.is_coder:
+                self._coders_by_tier[i].append(m)
+            else:
+                self._general_by_tier[i].append(m)
 
     def by_tier(self, tier: Tier) -> list[ModelInfo]:
-        return [m for m in self.models.values() if m.tier == tier]
+        """Models in ``tier``, largest first. The list is shared, do not mutate."""
+        return self._by_tier[tier - 1]
 
     def get_model_for_tier(self, tier: Tier, prefer_coder: bool = False) -> ModelInfo | None:
+        candidate_tier = tier
         candidates = self.by_tier(tier)
         if not candidates:
             # Fallback: try next higher tier
             for fallback_tier in Tier:
                 if fallback_tier > tier:
+                    candidate_tier = fallback_tier
                     candidates = self.by_tier(fallback_tier)
                     if candidates:
                         break
@@ -59,6 +84,7 @@ class ModelRegistry:
             # Last resort: try lower tiers
             for fallback_tier in reversed(list(Tier)):
                 if fallback_tier < tier:
+                    candidate_tier = fallback_tier
                     candidates = self.by_tier(fallback_tier)
                     if candidates:
                         break
@@ -66,29 +92,32 @@ class ModelRegistry:
             return None
 
         if prefer_coder:
-            coders = [m for m in candidates if m.is_coder]
+            coders = self._coders_by_tier[candidate_tier - 1]
             if coders:
-                return max(coders, key=lambda m: m.effective_params)
+                return coders[0]
         else:
             # Prefer non-coder models for general requests
-            general = [m for m in candidates if not m.is_coder]
+            general = self._general_by_tier[candidate_tier - 1]
             if general:
-                return max(general, key=lambda m: m.effective_params)
+                return general[0]
 
             # No non-coder in this tier — try adjacent tiers for non-coder
-            for fallback_tier in list(Tier):
+            for fallback_tier in Tier:
                 if fallback_tier != tier:
-                    adj_general = [m for m in self.by_tier(fallback_tier) if not m.is_coder]
+                    adj_general = self._general_by_tier[fallback_tier - 1]
                     if adj_general:
-                        return max(adj_general, key=lambda m: m.effective_params)
+                        return adj_general[0]
 
         # Last resort: pick the largest model in the tier regardless
-        return max(candidates, key=lambda m: m.effective_params)
+        return candidates[0]
 
 
 _registry = ModelRegistry()
+_refresh_lock = asyncio.Lock()
+_refresh_task: asyncio.Task | None = None
 
 
+@lru_cache(maxsize=2048)
 def _extract_params(model_id: str) -> tuple[float | None, float | None]:
     """Extract total and active parameter counts from model name."""
     moe_match = MOE_ACTIVE_PATTERN.search(model_id)
@@ -109,15 +138,6 @@ def _extract_params(model_id: str) -> tuple[float | None, float | None]:
     return total_params, active_params
 
 
-def _classify_tier(effective_params: float) -> Tier:
-    if effective_params <= get_config().tier1_max_params:
-        return Tier.SMALL
-    elif effective_params <= get_config().tier2_max_params:
-        return Tier.MEDIUM
-    else:
-        return Tier.LARGE
-
-
 def _is_chat_model(model_id: str) -> bool:
     if EMBEDDING_PATTERNS.search(model_id):
         return False
@@ -126,19 +146,35 @@ def _is_chat_model(model_id: str) -> bool:
     return True
 
 
+@lru_cache(maxsize=2048)
+def _classify_base(model_id: str) -> tuple[float | None, float | None, bool, bool]:
+    """Config-independent facts parsed from a model name.
+
+    Returns (total_params, active_params, is_coder, is_chat). The model list
+    rarely changes between refreshes, so results are memoized.
+    """
+    total_params, active_params = _extract_params(model_id)
+    is_coder = bool(CODER_PATTERN.search(model_id))
+    return total_params, active_params, is_coder, _is_chat_model(model_id)
+
+
 def _build_model_info(model_id: str) -> ModelInfo | None:
-    if not _is_chat_model(model_id):
+    total_params, active_params, is_coder, is_chat = _classify_base(model_id)
+    if not is_chat:
         return None
 
-    total_params, active_params = _extract_params(model_id)
     effective = total_params or active_params
 
-    if effective is not None:
-        tier = _classify_tier(effective)
-    else:
+    if effective is None:
         tier = Tier.MEDIUM  # Default for unknown models
-
-    is_coder = bool(re.search(r"coder|code", model_id, re.IGNORECASE))
+    else:
+        cfg = get_config()
+        if effective <= cfg.tier1_max_params:
+            tier = Tier.SMALL
+        elif effective <= cfg.tier2_max_params:
+            tier = Tier.MEDIUM
+        else:
+            tier = Tier.LARGE
 
     return ModelInfo(
         id=model_id,
@@ -149,21 +185,55 @@ def _build_model_info(model_id: str) -> ModelInfo | None:
     )
 
 
+def _is_fresh() -> bool:
+    return (time.time() - _registry._last_refresh) < get_config().model_cache_ttl
+
+
 async def refresh_models(force: bool = False) -> ModelRegistry:
+    """Return the model registry, refreshing it from LiteLLM when stale.
+
+    A stale registry that already has models is returned immediately while
+    a background task refreshes it; only the first load and ``force=True``
+    wait for LiteLLM.
+    """
+    global _refresh_task
+
+    if not force and _is_fresh():
+        return _registry
+
+    if not force and _registry.models:
+        if _refresh_task is None or _refresh_task.done():
+            _refresh_task = asyncio.create_task(_refresh_in_background())
+        return _registry
+
+    async with _refresh_lock:
+        return await _do_refresh(force)
+
+
+async def _refresh_in_background() -> None:
+    async with _refresh_lock:
+        try:
+            await _do_refresh(force=False)
+        except Exception:
+            pass  # already logged; keep serving the stale registry
+
+
+async def _do_refresh(force: bool) -> ModelRegistry:
     global _registry
 
-    now = time.time()
-    if not force and (now - _registry._last_refresh) < get_config().model_cache_ttl:
+    # Another caller may have refreshed while we waited for the lock
+    if not force and _is_fresh():
         return _registry
 
+    now = time.time()
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(
-                f"{get_config().litellm_base_url}/models",
-                headers={"Authorization": f"Bearer {get_config().litellm_api_key}"},
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await get_client().get(
+            f"{get_config().litellm_base_url}/models",
+            headers={"Authorization": f"Bearer {get_config().litellm_api_key}"},
+            timeout=10,
+        )
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
 
         # Reload router_config.yaml on every model refresh
         router_cfg = load_config()
@@ -171,7 +241,7 @@ async def refresh_models(force: bool = False) -> ModelRegistry:
         new_models: dict[str, ModelInfo] = {}
         skipped: list[str] = []
         for entry in data.get("data", []):
-            model_id = entry["id"]
+            model_id = sys.intern(entry["id"])
             info = _build_model_info(model_id)
             if not info:
                 continue
@@ -185,7 +255,7 @@ async def refresh_models(force: bool = False) -> ModelRegistry:
             tier_override = router_cfg.get_tier_override(model_id)
             if tier_override:
                 try:
-                    info.tier = Tier[tier_override]
+                    info = replace(info, tier=Tier[tier_override])
                     logger.info("Model %s: tier overridden to %s", model_id, tier_override)
                 except KeyError:
                     logger.warning("Invalid tier override '%s' for model %s", tier_override, model_id)
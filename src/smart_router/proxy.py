@@ -1,30 +1,84 @@
 """Proxies requests to LiteLLM backend, with streaming support."""
 
+import hashlib
 import logging
 from collections.abc import AsyncIterator
 
-import httpx
+import orjson
+from cachetools import TTLCache
 
+from .client import get_client
 from .config import get_config
 
 logger = logging.getLogger(__name__)
 
+# Completed non-streaming responses for deterministic (temperature 0) requests
+_response_cache: TTLCache | None = None
+
+
+def _get_response_cache() -> TTLCache | None:
+    """Return the response cache, rebuilt when its configured size or TTL changes."""
+    global _response_cache
+    cfg = get_config()
+    if cfg.response_cache_ttl <= 0:
+        return None
+    if (
+        _response_cache is None
+        or _response_cache.maxsize != cfg.response_cache_size
+        or _response_cache.ttl != cfg.response_cache_ttl
+    ):
+        _response_cache = TTLCache(maxsize=cfg.response_cache_size, ttl=cfg.response_cache_ttl)
+    return _response_cache
+
+
+def _upstream_payload(body: dict, model_id: str, stream: bool) -> bytes:
+    """Serialize the request body for LiteLLM with the routed model patched in."""
+    return orjson.dumps({**body, "model": model_id, "stream": stream})
+
+
+def _response_cache_key(body: dict, payload: bytes) -> bytes | None:
+    """Hash of the upstream request, or None if its response must not be reused."""
+    # Only temperature 0 is deterministic enough to replay
+    if body.get("temperature") != 0:
+        return None
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def _headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {get_config().litellm_api_key}",
+        "Content-Type": "application/json",
+    }
+
 
 async def proxy_chat_completion(
     body: dict,
     model_id: str,
-) -> dict:
-    """Forward a non-streaming chat completion request to LiteLLM."""
-    body = {**body, "model": model_id, "stream": False}
-
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.post(
-            f"{get_config().litellm_base_url}/chat/completions",
-            headers={"Authorization": f"Bearer {get_config().litellm_api_key}"},
-            json=body,
-        )
-        resp.raise_for_status()
-        return resp.json()
+) -> tuple[dict, bool]:
+    """Forward a non-streaming chat completion request to LiteLLM.
+
+    Returns the response and whether it was served from the response cache.
+    """
+    # Serialize once; the same bytes are keyed in the cache and sent upstream
+    payload = _upstream_payload(body, model_id, stream=False)
+    cache = _get_response_cache()
+    key = _response_cache_key(body, payload) if cache is not None else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return dict(cached), True
+
+    resp = await get_client().post(
+        f"{get_config().litellm_base_url}/chat/completions",
+        headers=_headers(),
+        content=payload,
+    )
+    resp.raise_for_status()
+    result = orjson.loads(resp.content)
+
+    if key is not None:
+        cache[key] = dict(result)
+    return result, False
 
 
 async def proxy_chat_completion_stream(
@@ -32,16 +86,15 @@ async def proxy_chat_completion_stream(
     model_id: str,
 ) -> AsyncIterator[bytes]:
     """Forward a streaming chat completion request to LiteLLM."""
-    body = {**body, "model": model_id, "stream": True}
-
-    async with httpx.AsyncClient(timeout=120) as client:
-        async with client.stream(
-            "POST",
-            f"{get_config().litellm_base_url}/chat/completions",
-            headers={"Authorization": f"Bearer {get_config().litellm_api_key}"},
-            json=body,
-        ) as resp:
-            resp.raise_for_status()
-            async for line in resp.aiter_lines():
-                if line:
-                    yield (line + "\n").encode()
+    payload = _upstream_payload(body, model_id, stream=True)
+
+    async with get_client().stream(
+        "POST",
+        f"{get_config().litellm_base_url}/chat/completions",
+        headers=_headers(),
+        content=payload,
+    ) as resp:
+        resp.raise_for_status()
+        # Pass SSE bytes through as they arrive; no decode/re-encode per line
+        async for chunk in resp.aiter_bytes():
+            yield chunk
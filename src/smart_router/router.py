@@ -1,19 +1,100 @@
 """Core routing logic: determines which model to use for a request."""
 
 import logging
+import re
+from collections.abc import Iterator
 
 from .config import get_config
 from .heuristics import score_request
 from .classifier import classify_complexity
 from .models import Tier, ModelInfo, get_registry, refresh_models
 
+try:
+    import hyperscan
+except ImportError:  # optional dependency, falls back to token matching
+    hyperscan = None
+
 logger = logging.getLogger(__name__)
 
+_CODING_KEYWORDS = (
+    "code", "function", "class", "implement", "bug", "error", "exception", "stacktrace",
+    "api", "endpoint", "database", "query", "sql", "html", "css", "javascript", "python",
+    "typescript", "rust", "golang", "java", "refactor", "test", "unittest",
+    # German
+    "implementiere", "debugge", "Quellcode", "Quelltext", "Programmier", "kompilier",
+    "Algorithmus", "Algorithmen", "Skript",
+)
+
+# Code fences or coding keywords; the fence goes first since it has no word
+# characters for \b to anchor on
+_CODING_RE = re.compile(
+    r"```|\b(?:" + "|".join(_CODING_KEYWORDS) + r")\b",
+    re.IGNORECASE,
+)
+
+# Every keyword is made of word characters, so a \b-bounded match is exactly a
+# maximal \w run equal to the keyword; lets the fallback test set membership
+_CODING_TOKENS = frozenset(word.lower() for word in _CODING_KEYWORDS)
+_WORD_RE = re.compile(r"\w+")
+# Same for ASCII text, where str and bytes patterns agree on \w
+_CODING_TOKENS_ASCII = frozenset(word.encode() for word in _CODING_TOKENS)
+_WORD_RE_ASCII = re.compile(rb"\w+")
+# Non-ASCII letters that re.IGNORECASE matches to an ASCII letter. Mapped first,
+# since lower() would turn "İ" into "i" plus a non-word combining mark.
+_RE_CASE_FOLD = str.maketrans("İıKſ", "iiks")
+
+
+def _scan_tokens(text: str) -> bool:
+    if "```" in text:
+        return True
+    if text.isascii():
+        return not _CODING_TOKENS_ASCII.isdisjoint(_WORD_RE_ASCII.findall(text.lower().encode()))
+    return not _CODING_TOKENS.isdisjoint(_WORD_RE.findall(text.translate(_RE_CASE_FOLD).lower()))
+
+
+def _compile_hyperscan_db():
+    """Compile `_CODING_RE` into a Hyperscan database that stops at the first match."""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[_CODING_RE.pattern.encode()],
+            ids=[0],
+            elements=1,
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH],
+        )
+    except Exception:
+        logger.warning("Failed to compile Hyperscan coding database, using token matching", exc_info=True)
+        return None
+    return db
+
+
+_HS_DB = _compile_hyperscan_db()
+
+
+def _stop_scan(*_) -> bool:
+    return True
+
+
+def _has_coding_marker(text: str) -> bool:
+    """Whether ``text`` contains a code fence or a coding keyword."""
+    # Hyperscan's \b only knows ASCII word characters, so anything else goes
+    # through token matching, which keeps Unicode word boundaries
+    if _HS_DB is not None and text.isascii():
+        try:
+            _HS_DB.scan(text.encode(), match_event_handler=_stop_scan)
+        except hyperscan.ScanTerminated:
+            return True
+        return False
+    return _scan_tokens(text)
+
 
 def _score_to_tier(score: float) -> Tier:
-    if score <= get_config().heuristic_low_threshold:
+    cfg = get_config()
+    if score <= cfg.heuristic_low_threshold:
         return Tier.SMALL
-    elif score >= get_config().heuristic_high_threshold:
+    elif score >= cfg.heuristic_high_threshold:
         return Tier.LARGE
     else:
         return Tier.MEDIUM
@@ -28,7 +109,9 @@ async def route_request(
 
     Returns the selected ModelInfo and a metadata dict with routing details.
     """
-    # Ensure models are loaded
+    # Ensure models are loaded. Once they are, this never waits on LiteLLM: a
+    # stale list is returned as is and refreshed in the background, so explicit
+    # requests are served straight away and still keep the list current.
     registry = await refresh_models()
 
     # If client explicitly requests a specific model that exists, honor it
@@ -41,14 +124,17 @@ async def route_request(
 
     # Step 1: Heuristic scoring
     heuristic = score_request(messages, tools)
-    logger.info(
-        "Heuristic score=%.3f confident=%s reasons=%s",
-        heuristic.score, heuristic.confident, heuristic.reasons,
-    )
+    score, reasons, confident = heuristic.score, heuristic.reasons, heuristic.confident
+    log_info = logger.isEnabledFor(logging.INFO)
+    if log_info:
+        logger.info(
+            "Heuristic score=%.3f confident=%s reasons=%s",
+            score, confident, reasons,
+        )
 
     # Step 2: Determine tier
-    if heuristic.confident:
-        tier = _score_to_tier(heuristic.score)
+    if confident:
+        tier = _score_to_tier(score)
         routing_method = "heuristic"
         classifier_reason = ""
     else:
@@ -64,51 +150,51 @@ async def route_request(
     if model is None:
         raise RuntimeError("No models available for routing")
 
+    tier_name = tier.name
     metadata = {
         "routing": routing_method,
-        "heuristic_score": heuristic.score,
-        "heuristic_reasons": heuristic.reasons,
-        "tier": tier.name,
+        "heuristic_score": score,
+        "heuristic_reasons": reasons,
+        "tier": tier_name,
         "selected_model": model.id,
         "prefer_coder": prefer_coder,
     }
     if classifier_reason:
         metadata["classifier_reason"] = classifier_reason
 
-    logger.info("Routed to %s (tier=%s, method=%s)", model.id, tier.name, routing_method)
+    if log_info:
+        logger.info("Routed to %s (tier=%s, method=%s)", model.id, tier_name, routing_method)
     return model, metadata
 
 
-def _is_coding_request(messages: list[dict]) -> bool:
-    """Check if the request is likely code-related."""
-    import re
-
-    code_indicators = re.compile(
-        r"\b(code|function|class|implement|bug|error|exception|stacktrace|"
-        r"api|endpoint|database|query|sql|html|css|javascript|python|"
-        r"typescript|rust|golang|java|refactor|test|unittest|"
-        # German
-        r"implementiere|debugge|Quellcode|Quelltext|Programmier|kompilier|"
-        r"Algorithmus|Algorithmen|Skript)\b",
-        re.IGNORECASE,
+def _block_texts(blocks: list) -> Iterator[str]:
+    return (
+        block.get("text", "")
+        for block in blocks
+        if isinstance(block, dict) and block.get("type") == "text"
     )
-    code_fence = re.compile(r"```")
 
-    # Check last 3 user messages
-    user_msgs = [m for m in messages if m.get("role") == "user"][-3:]
-    for msg in user_msgs:
+
+def _no_texts(content) -> tuple[()]:
+    return ()
+
+
+# Text extractor per message content type, picked once per message
+_CONTENT_TEXTS = {str: lambda content: (content,), list: _block_texts}
+
+
+def _iter_user_texts(messages: list[dict], limit: int = 3) -> Iterator[str]:
+    """Yield the text of the last ``limit`` user messages, newest first."""
+    for msg in reversed(messages):
+        if msg.get("role") != "user":
+            continue
         content = msg.get("content", "")
-        if isinstance(content, str):
-            if code_indicators.search(content):
-                return True
-            if code_fence.search(content):
-                return True
-        if isinstance(content, list):
-            for block in content:
-                if isinstance(block, dict) and block.get("type") == "text":
-                    text = block.get("text", "")
-                    if code_indicators.search(text):
-                        return True
-                    if code_fence.search(text):
-                        return True
-    return False
+        yield from _CONTENT_TEXTS.get(type(content), _no_texts)(content)
+        limit -= 1
+        if not limit:
+            return
+
+
+def _is_coding_request(messages: list[dict]) -> bool:
+    """Check if the request is likely code-related."""
+    return any(_has_coding_marker(text) for text in _iter_user_texts(messages, limit=3))
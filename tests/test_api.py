@@ -1,7 +1,8 @@
 import pytest
 from unittest.mock import patch, AsyncMock
-from httpx import AsyncClient, ASGITransport
+from httpx import AsyncClient, ASGITransport, Request, Response
 
+from smart_router import proxy
 from smart_router.main import app
 from smart_router.config import RouterConfig
 from smart_router.models import ModelInfo, ModelRegistry, Tier
@@ -70,10 +71,22 @@ class TestChatCompletions:
                 resp = await client.post("/v1/chat/completions", json={"messages": []})
                 assert resp.status_code == 400
 
+    @pytest.mark.asyncio
+    async def test_invalid_json_returns_400(self):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post(
+                "/v1/chat/completions",
+                content=b"{not json",
+                headers={"Content-Type": "application/json"},
+            )
+            assert resp.status_code == 400
+
     @pytest.mark.asyncio
     async def test_successful_completion(self, mock_registry, mock_completion_response):
         with patch("smart_router.main.route_request", new_callable=AsyncMock) as mock_route, \
-             patch("smart_router.main.proxy_chat_completion", new_callable=AsyncMock, return_value=mock_completion_response):
+             patch("smart_router.main.proxy_chat_completion", new_callable=AsyncMock,
+                   return_value=(mock_completion_response, False)):
             mock_route.return_value = (
                 ModelInfo(id="test-small", total_params=4, tier=Tier.SMALL),
                 {"routing": "heuristic", "tier": "SMALL", "heuristic_score": 0.1},
@@ -88,3 +101,29 @@ class TestChatCompletions:
                 assert resp.headers["x-smart-router-model"] == "test-small"
                 data = resp.json()
                 assert data["choices"][0]["message"]["content"] == "Hello!"
+                assert resp.headers["x-smart-router-cache"] == "miss"
+
+    @pytest.mark.asyncio
+    async def test_deterministic_completion_served_from_cache(self, mock_completion_response, monkeypatch):
+        monkeypatch.setattr(proxy, "_response_cache", None)
+        with patch("smart_router.main.route_request", new_callable=AsyncMock) as mock_route, \
+             patch("smart_router.proxy.get_client") as mock_client, \
+             patch("smart_router.proxy._upstream_payload", wraps=proxy._upstream_payload) as serialize:
+            mock_route.return_value = (
+                ModelInfo(id="test-small", total_params=4, tier=Tier.SMALL),
+                {"routing": "heuristic", "tier": "SMALL", "heuristic_score": 0.1},
+            )
+            upstream = mock_client.return_value.post = AsyncMock()
+            upstream.return_value = Response(200, json=mock_completion_response, request=Request("POST", "http://x"))
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as client:
+                body = {"messages": [{"role": "user", "content": "Hi"}], "temperature": 0}
+                first = await client.post("/v1/chat/completions", json=body)
+                second = await client.post("/v1/chat/completions", json=body)
+
+        assert first.headers["x-smart-router-cache"] == "miss"
+        assert second.headers["x-smart-router-cache"] == "hit"
+        assert second.json()["choices"] == first.json()["choices"]
+        assert upstream.await_count == 1
+        # Body serialized once per request, including the cache miss
+        assert serialize.call_count == 2
@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+
+from smart_router import classifier
+from smart_router.classifier import ClassifierBatcher, _cache_get, _cache_key, _cache_put, _condense_messages, _request_tokens
+from smart_router.config import RouterConfig
+from smart_router.models import Tier
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    classifier._cache.clear()
+    yield
+    classifier._cache.clear()
+
+
+class TestClassifierCache:
+    def test_exact_hit(self):
+        key = _cache_key("model", "user: hello")
+        _cache_put("model", key, frozenset(), Tier.SMALL, "trivial")
+        assert _cache_get("model", key, frozenset()) == (Tier.SMALL, "trivial")
+
+    def test_key_depends_on_classifier_model(self):
+        assert _cache_key("model-a", "user: hello") != _cache_key("model-b", "user: hello")
+
+    def test_fuzzy_hit_on_similar_request(self):
+        first = [{"role": "user", "content": "Design a scalable event sourcing architecture for payments"}]
+        second = [{"role": "user", "content": "Please design a scalable event sourcing architecture for payments"}]
+        _cache_put("m", _cache_key("m", "first"), _request_tokens(_condense_messages(first)), Tier.LARGE, "")
+        assert _cache_get(
+            "m", _cache_key("m", "second"), _request_tokens(_condense_messages(second))
+        ) == (Tier.LARGE, "")
+
+    def test_no_fuzzy_hit_after_different_earlier_turns(self):
+        latest = {"role": "user", "content": "Now apply the same approach to our billing and invoicing service"}
+        first = [
+            {"role": "user", "content": "Design a scalable event sourcing architecture for payments"},
+            {"role": "assistant", "content": "Use an append-only ledger with projections"},
+            latest,
+        ]
+        second = [
+            {"role": "user", "content": "Translate hello into French"},
+            {"role": "assistant", "content": "Bonjour"},
+            latest,
+        ]
+        _cache_put("m", _cache_key("m", "first"), _request_tokens(_condense_messages(first)), Tier.LARGE, "")
+        assert _cache_get("m", _cache_key("m", "second"), _request_tokens(_condense_messages(second))) is None
+
+    def test_no_fuzzy_hit_across_classifier_models(self):
+        messages = [{"role": "user", "content": "Design a scalable event sourcing architecture for payments"}]
+        tokens = _request_tokens(_condense_messages(messages))
+        _cache_put("old", _cache_key("old", "first"), tokens, Tier.LARGE, "")
+        assert _cache_get("new", _cache_key("new", "second"), tokens) is None
+
+    def test_no_fuzzy_hit_on_short_request(self):
+        messages = [{"role": "user", "content": "hello there"}]
+        tokens = _request_tokens(_condense_messages(messages))
+        _cache_put("m", _cache_key("m", "first"), tokens, Tier.SMALL, "")
+        assert _cache_get("m", _cache_key("m", "second"), tokens) is None
+
+    def test_size_limit_evicts_oldest(self):
+        cfg = classifier.get_config()
+        for i in range(cfg.classifier_cache_size + 1):
+            _cache_put("m", _cache_key("m", str(i)), frozenset(), Tier.MEDIUM, "")
+        assert len(classifier._cache) == cfg.classifier_cache_size
+        assert _cache_get("m", _cache_key("m", "0"), frozenset()) is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_one_call(self, monkeypatch):
+        cfg = RouterConfig()
+        cfg.classifier_model = "m"
+        cfg.classifier_batch_size = 1
+        monkeypatch.setattr(classifier, "get_config", lambda: cfg)
+        calls = []
+
+        async def fake_single(classifier_model, condensed):
+            calls.append(condensed)
+            await asyncio.sleep(0.01)
+            return Tier.LARGE, ""
+
+        monkeypatch.setattr(classifier, "_classify_single", fake_single)
+        messages = [{"role": "user", "content": "Plan a database migration"}]
+        results = await asyncio.gather(*(classifier.classify_complexity(messages) for _ in range(3)))
+
+        assert len(calls) == 1
+        assert results == [(Tier.LARGE, "")] * 3
+        assert not classifier._inflight
+
+
+class TestClassifierBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self, monkeypatch):
+        calls = []
+
+        async def fake_batch(classifier_model, condensed):
+            calls.append(list(condensed))
+            return [(Tier.SMALL, "a"), (Tier.LARGE, "b"), None]
+
+        monkeypatch.setattr(classifier, "_classify_batch", fake_batch)
+        batcher = ClassifierBatcher(max_batch=8, max_wait=0.05)
+        results = await asyncio.gather(
+            batcher.classify("m", "one"),
+            batcher.classify("m", "two"),
+            batcher.classify("m", "three"),
+            return_exceptions=True,
+        )
+        batcher.close()
+
+        assert calls == [["one", "two", "three"]]
+        assert results[0] == (Tier.SMALL, "a")
+        assert results[1] == (Tier.LARGE, "b")
+        assert isinstance(results[2], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_single_request_uses_single_prompt(self, monkeypatch):
+        async def fake_single(classifier_model, condensed):
+            return Tier.MEDIUM, condensed
+
+        monkeypatch.setattr(classifier, "_classify_single", fake_single)
+        batcher = ClassifierBatcher(max_batch=8, max_wait=0.01)
+        assert await batcher.classify("m", "only") == (Tier.MEDIUM, "only")
+        batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_splits_by_classifier_model(self, monkeypatch):
+        async def fake_single(classifier_model, condensed):
+            return Tier.SMALL, classifier_model
+
+        monkeypatch.setattr(classifier, "_classify_single", fake_single)
+        batcher = ClassifierBatcher(max_batch=8, max_wait=0.01)
+        results = await asyncio.gather(batcher.classify("m1", "x"), batcher.classify("m2", "y"))
+        batcher.close()
+        assert results == [(Tier.SMALL, "m1"), (Tier.SMALL, "m2")]
+
+    @pytest.mark.asyncio
+    async def test_close_fails_in_flight_flush(self, monkeypatch):
+        started = asyncio.Event()
+
+        async def slow_single(classifier_model, condensed):
+            started.set()
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(classifier, "_classify_single", slow_single)
+        batcher = ClassifierBatcher(max_batch=1, max_wait=0.01)
+        pending = asyncio.ensure_future(batcher.classify("m", "x"))
+        await asyncio.wait_for(started.wait(), 1)
+        assert len(batcher._flushes) == 1
+
+        batcher.close()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pending, 1)
+
+
+class TestReplyParsing:
+    @pytest.fixture
+    def reply(self, monkeypatch):
+        def set_reply(text):
+            async def fake_complete(*args):
+                return text
+            monkeypatch.setattr(classifier, "_complete", fake_complete)
+        return set_reply
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("text,tier", [
+        ('{"tier": 3}', Tier.LARGE),
+        ('```json\n{"tier":1}\n```', Tier.SMALL),
+        ('{"tier": "2", "reason": "coding"}', Tier.MEDIUM),
+        ('{"tier": 7}', Tier.LARGE),
+    ])
+    async def test_single_reply(self, reply, text, tier):
+        reply(text)
+        result, _ = await classifier._classify_single("m", "user: hi")
+        assert result == tier
+
+    @pytest.mark.asyncio
+    async def test_batch_reply(self, reply):
+        reply('```json\n[{"id":2,"tier":3},{"id":1,"tier":1}]\n```')
+        results = await classifier._classify_batch("m", ["a", "b", "c"])
+        assert results == [(Tier.SMALL, ""), (Tier.LARGE, ""), None]
+
+
+class TestCondenseMessages:
+    def test_non_string_role(self):
+        condensed = classifier._condense_messages([{"role": None, "content": "hi"}, {"content": "there"}])
+        assert condensed == "None: hi\nunknown: there"
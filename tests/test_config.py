@@ -57,6 +57,12 @@ class TestParseModelsConfig:
         assert cfg.tier_overrides["model-a"] == "SMALL"
         assert cfg.tier_overrides["model-b"] == "LARGE"
 
+    def test_models_frozen(self):
+        cfg = RouterConfig()
+        _parse_models_config(cfg, {"small": ["model-a"], "model-b": None})
+        assert isinstance(cfg.allowed_models, frozenset)
+        assert cfg.allowed_models == {"model-a", "model-b"}
+
     def test_empty_models(self):
         cfg = RouterConfig()
         _parse_models_config(cfg, [])
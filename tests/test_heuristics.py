@@ -1,3 +1,6 @@
+import pytest
+
+from smart_router import heuristics
 from smart_router.heuristics import score_request
 
 
@@ -115,6 +118,35 @@ class TestHeuristicScoring:
         # "implement" is complex → 0.35, tokens short → 0.0, total ~0.35
         assert not result.confident
 
+    def test_long_conversation_beyond_scan_window(self):
+        messages = [
+            {"role": "user", "content": "x" * 20000},
+            {"role": "assistant", "content": "y" * 20000},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "And this one?"},
+                    {"type": "image_url", "image_url": {"url": "data:image/png;base64,abc"}},
+                ],
+            },
+        ]
+        result = score_request(messages)
+        assert any("very long" in r for r in result.reasons)
+        assert any("image" in r.lower() for r in result.reasons)
+
+    @pytest.mark.parametrize(
+        "texts, max_chars",
+        [
+            (["x" * 20000, "y" * 20000], 100),
+            (["xxxxx", "xxxxxxxxx", "xxx"], 16),
+            (["abc", "def"], 3),
+            (["abc", "def"], 0),
+            ([], 10),
+        ],
+    )
+    def test_join_window_matches_sliced_join(self, texts, max_chars):
+        assert heuristics._join_window(texts, max_chars) == "\n".join(texts)[:max_chars]
+
     def test_empty_messages(self):
         result = score_request([])
         assert result.score == 0.0
@@ -122,3 +154,102 @@ class TestHeuristicScoring:
     def test_score_clamped_to_range(self, complex_messages, tools_fixture):
         result = score_request(complex_messages, tools=tools_fixture)
         assert 0.0 <= result.score <= 1.0
+
+    @pytest.mark.parametrize("text,score,confident", [
+        # Overlapping categories and keywords inside code fences all count
+        ("explain in detail how this works", 0.45, True),
+        ("Please explain in detail the trade-offs", 0.55, True),
+        ("implement a function ```def design()...``` and debug", 0.7, False),
+    ])
+    def test_keyword_scores_unchanged(self, text, score, confident):
+        result = score_request([{"role": "user", "content": text}])
+        assert result.score == score
+        assert result.confident == confident
+
+    @pytest.mark.parametrize("text", [
+        "What is 2+2?",
+        "implement something",
+        "Fix this:\n```a``` ```b``` ```c```",
+        "Analyse the trade-offs between X and Y",
+    ])
+    def test_short_request_fast_path_matches_full_path(self, text):
+        fast = score_request([{"role": "user", "content": text}])
+        # List content bypasses the fast path
+        full = score_request([{"role": "user", "content": [{"type": "text", "text": text}]}])
+        assert fast.score == full.score
+        assert fast.confident == full.confident
+
+    @pytest.mark.parametrize("role", ["user", "system", "assistant"])
+    def test_single_short_message_matches_full_path(self, role, monkeypatch):
+        # e.g. a short CJK system prompt can be over 100 tokens
+        monkeypatch.setattr(heuristics, "_estimate_tokens", lambda text: 150)
+        fast = score_request([{"role": role, "content": "implement it"}])
+        full = score_request([{"role": role, "content": [{"type": "text", "text": "implement it"}]}])
+        assert fast.score == full.score
+        assert fast.reasons == full.reasons
+
+
+class TestKeywordScanBackends:
+    @pytest.mark.parametrize("text", [
+        "Write a complete app, explain in detail, what is X, ```implement``` pros and cons",
+        "Überprüfe und erkläre Schritt für Schritt",
+        "fasse das zusammen bitte, schreibe eine komplette App, vollständig",
+        "Pokaż listę zakupów",
+        "Zrób designę, then design it",
+        "İstanbul: Übersetze das",
+        "Was ißt du",
+        "wäs ist das, änalysiere trade-offß",
+    ])
+    def test_hyperscan_matches_re(self, text):
+        if heuristics._HS_DB is None:
+            pytest.skip("hyperscan not installed")
+        assert heuristics._scan_keywords(text) == heuristics._scan_keywords_re(text)
+
+    def test_matches_keep_original_spelling(self):
+        assert heuristics._scan_keywords("İstanbul: Übersetze das")["simple"] == ["Übersetze"]
+
+
+class TestTokenEstimate:
+    @pytest.fixture
+    def encoding(self, monkeypatch):
+        class CountingEncoding:
+            calls = 0
+
+            def encode(self, text, disallowed_special=()):
+                self.calls += 1
+                return text.split()
+
+        enc = CountingEncoding()
+        monkeypatch.setattr(heuristics, "_encoding", enc)
+        monkeypatch.setattr(heuristics, "_token_counts", heuristics.OrderedDict())
+        return enc
+
+    def test_falls_back_to_length_without_encoding(self, monkeypatch):
+        monkeypatch.setattr(heuristics, "_encoding", None)
+        assert heuristics._estimate_tokens("x" * 400) == 100
+
+    def test_request_path_never_loads_encoding(self, monkeypatch):
+        class NoLoad:
+            def get_encoding(self, name):
+                raise AssertionError("encoding loaded on the request path")
+
+        monkeypatch.setattr(heuristics, "tiktoken", NoLoad())
+        monkeypatch.setattr(heuristics, "_encoding", None)
+        score_request([{"role": "user", "content": "Tell me about Python. " * 20}])
+
+    def test_repeated_messages_hit_cache(self, encoding):
+        messages = [
+            {"role": "system", "content": "You are helpful. " * 20},
+            {"role": "user", "content": "Tell me about Python. " * 20},
+        ]
+        score_request(messages)
+        score_request(messages + [{"role": "assistant", "content": "Sure."}])
+        # Only the new assistant turn is encoded the second time
+        assert encoding.calls == 3
+
+    def test_cache_holds_digests_not_text(self, encoding, monkeypatch):
+        monkeypatch.setattr(heuristics, "TOKEN_CACHE_SIZE", 2)
+        for text in ("one two", "three", "four five six"):
+            heuristics._estimate_tokens(text)
+        assert list(heuristics._token_counts.values()) == [1, 3]
+        assert all(isinstance(k, bytes) and len(k) == 16 for k in heuristics._token_counts)
@@ -1,7 +1,13 @@
+import asyncio
+import time
+
 import pytest
 
+from smart_router import models
+from smart_router.config import RouterConfig
 from smart_router.models import (
     Tier,
+    refresh_models,
     _extract_params,
     _build_model_info,
     _is_chat_model,
@@ -101,6 +107,15 @@ class TestModelRegistry:
         assert len(registry.by_tier(Tier.MEDIUM)) == 1
         assert len(registry.by_tier(Tier.LARGE)) == 1
 
+    def test_by_tier_sorted_largest_first(self):
+        registry = ModelRegistry(models={
+            "medium-a": ModelInfo(id="medium-a", total_params=14, tier=Tier.MEDIUM),
+            "medium-b": ModelInfo(id="medium-b", total_params=24, tier=Tier.MEDIUM),
+            "medium-c": ModelInfo(id="medium-c", total_params=20, tier=Tier.MEDIUM),
+        })
+        assert [m.id for m in registry.by_tier(Tier.MEDIUM)] == ["medium-b", "medium-c", "medium-a"]
+        assert registry.by_tier(Tier.SMALL) == []
+
     def test_get_model_for_tier_fallback_up(self):
         registry = ModelRegistry(models={
             "medium": ModelInfo(id="medium", total_params=24, tier=Tier.MEDIUM),
@@ -143,3 +158,48 @@ class TestModelRegistry:
     def test_empty_registry(self):
         registry = ModelRegistry()
         assert registry.get_model_for_tier(Tier.SMALL) is None
+
+
+class TestRefreshModels:
+    @pytest.mark.asyncio
+    async def test_stale_registry_served_while_refreshing(self, monkeypatch):
+        stale = ModelRegistry(models={"small": ModelInfo(id="small", total_params=4, tier=Tier.SMALL)})
+        fresh = ModelRegistry(models={}, _last_refresh=time.time())
+        refreshed = asyncio.Event()
+
+        async def fake_refresh(force):
+            await asyncio.sleep(0)
+            models._registry = fresh
+            refreshed.set()
+            return fresh
+
+        monkeypatch.setattr(models, "_registry", stale)
+        monkeypatch.setattr(models, "_refresh_task", None)
+        monkeypatch.setattr(models, "_do_refresh", fake_refresh)
+
+        assert await refresh_models() is stale
+        await asyncio.wait_for(refreshed.wait(), 1)
+        assert models.get_registry() is fresh
+
+    @pytest.mark.asyncio
+    async def test_empty_registry_waits_for_refresh(self, monkeypatch):
+        loaded = ModelRegistry(models={"small": ModelInfo(id="small", total_params=4, tier=Tier.SMALL)})
+
+        async def fake_refresh(force):
+            return loaded
+
+        monkeypatch.setattr(models, "_registry", ModelRegistry())
+        monkeypatch.setattr(models, "_do_refresh", fake_refresh)
+        assert await refresh_models() is loaded
+
+    @pytest.mark.asyncio
+    async def test_tier_override_applied(self, monkeypatch, httpx_mock):
+        cfg = RouterConfig()
+        cfg.tier_overrides = {"gemma-3-27b": "LARGE"}
+        monkeypatch.setattr(models, "load_config", lambda: cfg)
+        monkeypatch.setattr(models, "_registry", ModelRegistry())
+        httpx_mock.add_response(json={"data": [{"id": "gemma-3-27b"}, {"id": "qwen-3-4b"}]})
+
+        registry = await refresh_models(force=True)
+        assert registry.models["gemma-3-27b"].tier == Tier.LARGE
+        assert registry.models["qwen-3-4b"].tier == Tier.SMALL
@@ -1,6 +1,9 @@
+import asyncio
+
 import pytest
 from unittest.mock import patch, AsyncMock
 
+from smart_router import models, router
 from smart_router.models import Tier, ModelInfo, ModelRegistry
 from smart_router.router import route_request, _score_to_tier, _is_coding_request
 
@@ -47,6 +50,26 @@ class TestIsCodingRequest:
         messages = [{"role": "user", "content": "analysiere e autos vs verbrenner"}]
         assert not _is_coding_request(messages)
 
+    def test_text_blocks_in_list_content(self):
+        messages = [{"role": "user", "content": [
+            "stray",
+            {"type": "image_url", "image_url": {"url": "data:"}},
+            {"type": "text", "text": "Why does this SQL query fail?"},
+        ]}]
+        assert _is_coding_request(messages)
+
+    def test_unknown_content_type_ignored(self):
+        assert not _is_coding_request([{"role": "user", "content": None}])
+
+    def test_only_last_three_user_messages(self):
+        messages = [{"role": "user", "content": "Write a Python function"}]
+        messages += [
+            {"role": "assistant", "content": "Done."},
+            {"role": "user", "content": "Thanks, what is the weather like?"},
+        ] * 3
+        assert not _is_coding_request(messages)
+        assert _is_coding_request(messages[:-2])
+
 
 class TestRouteRequest:
     @pytest.fixture
@@ -75,6 +98,27 @@ class TestRouteRequest:
             assert model.id == "large-model"
             assert meta["routing"] == "explicit"
 
+    @pytest.mark.asyncio
+    async def test_explicit_model_schedules_stale_refresh_without_waiting(
+        self, simple_messages, mock_registry, monkeypatch
+    ):
+        release = asyncio.Event()
+
+        async def slow_refresh(force):
+            await release.wait()
+
+        monkeypatch.setattr(models, "_registry", mock_registry)
+        monkeypatch.setattr(models, "_refresh_task", None)
+        monkeypatch.setattr(models, "_do_refresh", slow_refresh)
+
+        model, meta = await asyncio.wait_for(
+            route_request(simple_messages, requested_model="small-model"), 1
+        )
+        assert model.id == "small-model"
+        assert models._refresh_task is not None and not models._refresh_task.done()
+        release.set()
+        await models._refresh_task
+
     @pytest.mark.asyncio
     async def test_complex_request_routes_to_large(self, complex_messages, mock_registry):
         with patch("smart_router.router.refresh_models", new_callable=AsyncMock, return_value=mock_registry), \
@@ -88,3 +132,29 @@ class TestRouteRequest:
              patch("smart_router.router.get_registry", return_value=mock_registry):
             model, meta = await route_request(coding_messages)
             assert meta["prefer_coder"] is True
+
+
+CODING_SCAN_TEXTS = [
+    "Write a Python function",
+    "```\nfoo()\n```",
+    "a decoder ring and a barcode",
+    "Übersetze den Quellcode",
+    "Programmierung, tests, test_case and code2",
+    "débug this",
+    "İcode",
+    "İmplement it",
+    "claſs",
+    "nothing to see here",
+]
+
+
+class TestCodingScanBackends:
+    @pytest.mark.parametrize("text", CODING_SCAN_TEXTS)
+    @pytest.mark.parametrize("scan,backend", [
+        ("_has_coding_marker", "_HS_DB"),
+        ("_scan_tokens", None),
+    ])
+    def test_backend_matches_re(self, scan, backend, text):
+        if backend is not None and getattr(router, backend) is None:
+            pytest.skip(f"{scan} backend not installed")
+        assert getattr(router, scan)(text) == (router._CODING_RE.search(text) is not None)